@@ -0,0 +1,72 @@
+"""
+BlueZ advertisement backend for the heart rate bridge
+
+Instead of serving GATT notifications, the current heart rate is carried in
+the Service Data of a connectionless BLE advertisement for the Heart Rate
+Service (0x180D). Any scanner can read it without connecting. This needs
+BlueZ (Linux) and talks to it directly over D-Bus with dbus-fast.
+"""
+
+import logging
+from typing import Optional
+
+from dbus_fast import BusType
+from dbus_fast.aio import MessageBus, ProxyInterface
+
+from ble_backend import BLEBackend
+from bluez_common import ADVERTISEMENT_PATH, HeartRateBroadcastAdvertisement, get_adapter
+
+
+logger = logging.getLogger(__name__)
+
+
+class AdvertisementBackend(BLEBackend):
+    # The heart rate is only ever read from the advertisement
+    connectable = False
+    
+    def __init__(self, adapter: str = "hci0"):
+        """
+        Args:
+            adapter: The BlueZ adapter to advertise on
+        """
+        self.adapter = adapter
+        self._bus: Optional[MessageBus] = None
+        self._manager: Optional[ProxyInterface] = None
+        self._advertisement: Optional[HeartRateBroadcastAdvertisement] = None
+    
+    async def start(self, name: str):
+        """Register the heart rate advertisement with BlueZ."""
+        self._bus = await MessageBus(bus_type=BusType.SYSTEM).connect()
+        
+        # Export the advertisement object for BlueZ to read its properties from
+        self._advertisement = HeartRateBroadcastAdvertisement(name)
+        self._bus.export(ADVERTISEMENT_PATH, self._advertisement)
+        
+        adapter = await get_adapter(self._bus, self.adapter)
+        self._manager = adapter.get_interface("org.bluez.LEAdvertisingManager1")
+        await self._manager.call_register_advertisement(ADVERTISEMENT_PATH, {})
+    
+    async def update_hr(self, payload: bytes):
+        """Put the heart rate into the advertisement's Service Data."""
+        # A legacy advertisement has no room for RR intervals next to the
+        # flags, UUID and name, so only the flags and UINT8 heart rate go out
+        self._advertisement.service_data = bytes((payload[0] & ~0x10, payload[1]))
+        
+        # BlueZ refreshes the advertising data when the property changes
+        self._advertisement.emit_properties_changed({"ServiceData": self._advertisement.ServiceData})
+    
+    async def stop(self):
+        """Unregister the advertisement and close the D-Bus connection."""
+        if self._bus is None:
+            return
+        
+        if self._manager is not None:
+            try:
+                await self._manager.call_unregister_advertisement(ADVERTISEMENT_PATH)
+            except Exception as e:
+                logger.warning(f"Could not unregister advertisement: {e}")
+            self._manager = None
+        
+        self._bus.unexport(ADVERTISEMENT_PATH)
+        self._bus.disconnect()
+        self._bus = None
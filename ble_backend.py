@@ -0,0 +1,68 @@
+"""
+Bluetooth LE backends for the heart rate bridge
+
+The bridge only needs to start a Heart Rate Service peripheral, push
+Heart Rate Measurement payloads and stop it again. Each BLE library is
+wrapped in its own module, imported only when that backend is selected.
+"""
+
+import importlib
+import os
+import sys
+from abc import ABC, abstractmethod
+from typing import Optional
+
+
+# Bluetooth LE Heart Rate Service and Characteristic UUIDs
+HEART_RATE_SERVICE_UUID = "0000180D-0000-1000-8000-00805F9B34FB"
+HEART_RATE_MEASUREMENT_CHAR_UUID = "00002A37-0000-1000-8000-00805F9B34FB"
+
+# Environment variable used to choose a backend when none is passed in;
+# on Linux BlueZ is driven directly, elsewhere bless provides the peripheral
+BACKEND_ENV_VAR = "HRM_BLE_BACKEND"
+DEFAULT_BACKEND = "bluez" if sys.platform.startswith("linux") else "bless"
+
+# Backend name -> (module, class), imported on demand
+_BACKENDS = {
+    "bless": ("bless_backend", "BlessBackend"),
+    "bluez": ("bluez_backend", "BluezBackend"),
+    "advertisement": ("advertisement_backend", "AdvertisementBackend"),
+}
+
+
+class BLEBackend(ABC):
+    """Peripheral exposing the Heart Rate Service over Bluetooth LE."""
+    
+    # Whether centrals can connect to the peripheral
+    connectable = True
+    
+    @abstractmethod
+    async def start(self, name: str):
+        """Start advertising the Heart Rate Service under the given name."""
+    
+    @abstractmethod
+    async def update_hr(self, payload: bytes):
+        """Notify subscribers with a Heart Rate Measurement payload."""
+    
+    @abstractmethod
+    async def stop(self):
+        """Stop advertising and release the Bluetooth adapter."""
+
+
+def create_backend(name: Optional[str] = None) -> BLEBackend:
+    """
+    Create a BLE backend, importing its library only now.
+    
+    Args:
+        name: Backend name; defaults to $HRM_BLE_BACKEND, else "bluez" on Linux and "bless" elsewhere
+    """
+    if name is None:
+        name = os.environ.get(BACKEND_ENV_VAR, DEFAULT_BACKEND)
+    
+    try:
+        module_name, class_name = _BACKENDS[name.lower()]
+    except KeyError:
+        raise ValueError(f"Unknown BLE backend '{name}', expected one of: {', '.join(_BACKENDS)}")
+    
+    module = importlib.import_module(module_name)
+    return getattr(module, class_name)()
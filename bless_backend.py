@@ -0,0 +1,70 @@
+"""
+Bless backend for the heart rate bridge
+
+Bless provides a cross-platform BLE peripheral (BlueZ, CoreBluetooth, WinRT).
+"""
+
+import logging
+from typing import Optional
+
+from bless import BlessServer, BlessGATTService, BlessGATTCharacteristic
+from bless.backends.server import GATTAttributePermissions
+from bless.backends.server import GATTCharacteristicProperties
+
+from ble_backend import BLEBackend, HEART_RATE_SERVICE_UUID, HEART_RATE_MEASUREMENT_CHAR_UUID
+
+
+logger = logging.getLogger(__name__)
+
+
+class BlessBackend(BLEBackend):
+    def __init__(self):
+        self.server: Optional[BlessServer] = None
+        self.heart_rate_characteristic: Optional[BlessGATTCharacteristic] = None
+        self._char_uuid = None
+    
+    async def start(self, name: str):
+        """Create the Heart Rate Service and start advertising."""
+        # Create a new Bless server
+        server = BlessServer(name=name)
+        
+        # Create the heart rate service
+        heart_rate_service = BlessGATTService(HEART_RATE_SERVICE_UUID)
+        
+        # Create the heart rate measurement characteristic
+        heart_rate_char = BlessGATTCharacteristic(
+            uuid=HEART_RATE_MEASUREMENT_CHAR_UUID,
+            properties=GATTCharacteristicProperties.notify,
+            permissions=GATTAttributePermissions.readable
+        )
+        
+        # Add the characteristic to the service
+        heart_rate_service.add_characteristic(heart_rate_char)
+        
+        # Add the service to the server
+        server.add_service(heart_rate_service)
+        
+        # Subscribe to notifications (though we'll push data from our side)
+        def on_update_requested(characteristic: BlessGATTCharacteristic, value: bytearray):
+            logger.debug(f"Update requested for characteristic {characteristic}")
+        
+        server.subscribe(HEART_RATE_MEASUREMENT_CHAR_UUID, on_update_requested)
+        
+        # Start the server
+        await server.start()
+        
+        # Store the server and characteristic for later use, resolving the
+        # characteristic once instead of on every notification
+        self.server = server
+        self.heart_rate_characteristic = heart_rate_char
+        self._char_uuid = heart_rate_char.uuid
+    
+    async def update_hr(self, payload: bytes):
+        """Update the Heart Rate Measurement characteristic value."""
+        await self.server.update_value(self._char_uuid, payload)
+    
+    async def stop(self):
+        """Stop the Bless server if it was started."""
+        if self.server:
+            await self.server.stop()
+            self.server = None
@@ -0,0 +1,147 @@
+"""
+BlueZ GATT backend for the heart rate bridge
+
+Serves the Heart Rate Service as a BlueZ GATT application over D-Bus with
+dbus-fast (Linux only). The characteristic's object path is fixed, so each
+update is a single PropertiesChanged signal on its Value, which BlueZ turns
+into a notification for subscribed clients.
+"""
+
+import logging
+from typing import Optional
+
+from dbus_fast import BusType
+from dbus_fast.aio import MessageBus, ProxyInterface
+from dbus_fast.service import ServiceInterface, PropertyAccess, dbus_property, method
+
+from ble_backend import BLEBackend, HEART_RATE_SERVICE_UUID, HEART_RATE_MEASUREMENT_CHAR_UUID
+from bluez_common import ADVERTISEMENT_PATH, HeartRateAdvertisement, get_adapter
+
+
+logger = logging.getLogger(__name__)
+
+# The GATT application gets its own subtree so that GetManagedObjects on it
+# doesn't also list the advertisement, which lives elsewhere under /org/hrmbridge
+APPLICATION_PATH = "/org/hrmbridge/gatt"
+SERVICE_PATH = f"{APPLICATION_PATH}/service0"
+CHARACTERISTIC_PATH = f"{SERVICE_PATH}/char0"
+
+
+class HeartRateService(ServiceInterface):
+    """org.bluez.GattService1 object for the Heart Rate Service."""
+    
+    def __init__(self):
+        super().__init__("org.bluez.GattService1")
+    
+    @dbus_property(access=PropertyAccess.READ)
+    def UUID(self) -> "s":
+        return HEART_RATE_SERVICE_UUID
+    
+    @dbus_property(access=PropertyAccess.READ)
+    def Primary(self) -> "b":
+        return True
+
+
+class HeartRateMeasurementCharacteristic(ServiceInterface):
+    """org.bluez.GattCharacteristic1 object for the Heart Rate Measurement."""
+    
+    def __init__(self):
+        super().__init__("org.bluez.GattCharacteristic1")
+        self.value = bytes(2)
+        self.notifying = False
+    
+    @dbus_property(access=PropertyAccess.READ)
+    def UUID(self) -> "s":
+        return HEART_RATE_MEASUREMENT_CHAR_UUID
+    
+    @dbus_property(access=PropertyAccess.READ)
+    def Service(self) -> "o":
+        return SERVICE_PATH
+    
+    @dbus_property(access=PropertyAccess.READ)
+    def Flags(self) -> "as":
+        return ["notify"]
+    
+    @dbus_property(access=PropertyAccess.READ)
+    def Value(self) -> "ay":
+        return self.value
+    
+    @dbus_property(access=PropertyAccess.READ)
+    def Notifying(self) -> "b":
+        return self.notifying
+    
+    @method()
+    def StartNotify(self):
+        logger.debug("Client subscribed to heart rate notifications")
+        self.notifying = True
+    
+    @method()
+    def StopNotify(self):
+        logger.debug("Client unsubscribed from heart rate notifications")
+        self.notifying = False
+
+
+class BluezBackend(BLEBackend):
+    def __init__(self, adapter: str = "hci0"):
+        """
+        Args:
+            adapter: The BlueZ adapter to serve the GATT application on
+        """
+        self.adapter = adapter
+        self._bus: Optional[MessageBus] = None
+        self._gatt_manager: Optional[ProxyInterface] = None
+        self._advertising_manager: Optional[ProxyInterface] = None
+        self._characteristic: Optional[HeartRateMeasurementCharacteristic] = None
+    
+    async def start(self, name: str):
+        """Register the Heart Rate Service and a connectable advertisement with BlueZ."""
+        self._bus = await MessageBus(bus_type=BusType.SYSTEM).connect()
+        
+        # Export the GATT objects and the advertisement at their fixed paths.
+        # BlueZ reads the GATT objects through GetManagedObjects on
+        # APPLICATION_PATH, which the bus answers itself for every object
+        # exported below that path
+        self._characteristic = HeartRateMeasurementCharacteristic()
+        self._bus.export(SERVICE_PATH, HeartRateService())
+        self._bus.export(CHARACTERISTIC_PATH, self._characteristic)
+        self._bus.export(ADVERTISEMENT_PATH, HeartRateAdvertisement(name))
+        
+        adapter = await get_adapter(self._bus, self.adapter)
+        
+        self._gatt_manager = adapter.get_interface("org.bluez.GattManager1")
+        await self._gatt_manager.call_register_application(APPLICATION_PATH, {})
+        
+        self._advertising_manager = adapter.get_interface("org.bluez.LEAdvertisingManager1")
+        await self._advertising_manager.call_register_advertisement(ADVERTISEMENT_PATH, {})
+    
+    async def update_hr(self, payload: bytes):
+        """Update the Heart Rate Measurement value, notifying subscribed clients."""
+        self._characteristic.value = payload
+        
+        # Without a subscriber there is nobody to notify, so skip the D-Bus signal
+        if self._characteristic.notifying:
+            self._characteristic.emit_properties_changed({"Value": payload})
+    
+    async def stop(self):
+        """Unregister from BlueZ and close the D-Bus connection."""
+        if self._bus is None:
+            return
+        
+        if self._advertising_manager is not None:
+            try:
+                await self._advertising_manager.call_unregister_advertisement(ADVERTISEMENT_PATH)
+            except Exception as e:
+                logger.warning(f"Could not unregister advertisement: {e}")
+            self._advertising_manager = None
+        
+        if self._gatt_manager is not None:
+            try:
+                await self._gatt_manager.call_unregister_application(APPLICATION_PATH)
+            except Exception as e:
+                logger.warning(f"Could not unregister GATT application: {e}")
+            self._gatt_manager = None
+        
+        for path in (ADVERTISEMENT_PATH, CHARACTERISTIC_PATH, SERVICE_PATH):
+            self._bus.unexport(path)
+        self._bus.disconnect()
+        self._bus = None
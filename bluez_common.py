@@ -0,0 +1,68 @@
+"""
+Shared BlueZ D-Bus pieces for the heart rate bridge backends
+
+Both BlueZ backends talk to bluetoothd over D-Bus with dbus-fast and
+advertise the Heart Rate Service through org.bluez.LEAdvertisingManager1.
+"""
+
+import logging
+
+from dbus_fast import Variant
+from dbus_fast.aio import MessageBus, ProxyObject
+from dbus_fast.service import ServiceInterface, PropertyAccess, dbus_property, method
+
+from ble_backend import HEART_RATE_SERVICE_UUID
+
+
+logger = logging.getLogger(__name__)
+
+BLUEZ_SERVICE = "org.bluez"
+ADVERTISEMENT_PATH = "/org/hrmbridge/advertisement0"
+
+
+async def get_adapter(bus: MessageBus, adapter: str) -> ProxyObject:
+    """Look up the BlueZ adapter object (e.g. "hci0") on the system bus."""
+    adapter_path = f"/org/bluez/{adapter}"
+    introspection = await bus.introspect(BLUEZ_SERVICE, adapter_path)
+    return bus.get_proxy_object(BLUEZ_SERVICE, adapter_path, introspection)
+
+
+class HeartRateAdvertisement(ServiceInterface):
+    """Connectable org.bluez.LEAdvertisement1 object for the Heart Rate Service."""
+    
+    def __init__(self, local_name: str):
+        super().__init__("org.bluez.LEAdvertisement1")
+        self.local_name = local_name
+    
+    @method()
+    def Release(self):
+        logger.info("BlueZ released the heart rate advertisement")
+    
+    @dbus_property(access=PropertyAccess.READ)
+    def Type(self) -> "s":
+        return "peripheral"
+    
+    @dbus_property(access=PropertyAccess.READ)
+    def LocalName(self) -> "s":
+        return self.local_name
+    
+    @dbus_property(access=PropertyAccess.READ)
+    def ServiceUUIDs(self) -> "as":
+        return [HEART_RATE_SERVICE_UUID]
+
+
+class HeartRateBroadcastAdvertisement(HeartRateAdvertisement):
+    """Non-connectable advertisement carrying the heart rate as Service Data."""
+    
+    def __init__(self, local_name: str):
+        super().__init__(local_name)
+        self.service_data = bytes(2)
+    
+    @dbus_property(access=PropertyAccess.READ)
+    def Type(self) -> "s":
+        # Non-connectable: the heart rate is only ever read from the advertisement
+        return "broadcast"
+    
+    @dbus_property(access=PropertyAccess.READ)
+    def ServiceData(self) -> "a{sv}":
+        return {HEART_RATE_SERVICE_UUID: Variant("ay", self.service_data)}
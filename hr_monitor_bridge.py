@@ -7,9 +7,11 @@ and broadcasts the heart rate data via Bluetooth LE using the BLE Heart Rate Ser
 """
 
 import asyncio
+import collections
 import logging
 import struct
-import time
+import sys
+import threading
 from typing import Optional
 
 from openant import easy
@@ -17,40 +19,125 @@ from openant.easy.node import Node
 from openant.easy.channel import Channel
 from openant.base.message import Message
 from openant.easy.filter import wait_for_event
-from bless import BlessServer, BlessGATTService, BlessGATTCharacteristic
-from bless.backends.server import GATTAttributePermissions
-from bless.backends.server import GATTCharacteristicProperties
 import uuid
 
+from ble_backend import BLEBackend, create_backend
+from ble_backend import HEART_RATE_SERVICE_UUID, HEART_RATE_MEASUREMENT_CHAR_UUID
+
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Time to collect further samples before sending a batched notification (seconds)
+HR_BATCH_WINDOW = 0.05
+
+# Longest time without a notification while the heart rate is unchanged (seconds)
+HR_KEEPALIVE_INTERVAL = 5.0
+
+# Delay after a rejected notification, doubled on each further failure (seconds).
+# This is the bridge's only backpressure and it needs update_hr to raise, which
+# only bless does; the bluez and advertisement backends emit a D-Bus signal and
+# never report overload, so on them notifications are not throttled at all
+HR_SEND_BACKOFF_MIN = 0.1
+HR_SEND_BACKOFF_MAX = 2.0
+
+# RR intervals that fit in one notification with the default 23-byte ATT MTU
+# (20-byte payload: flags + UINT8 heart rate + 9 UINT16 intervals)
+HR_MAX_RR_INTERVALS = 9
+
+
+# ANT+ HRM data page parsers
+# Every page carries the same heart beat fields in bytes 4-7:
+# Bytes 4-5: Heart beat event time (1/1024 s, little-endian)
+# Byte 6: Heart beat count
+# Byte 7: Computed heart rate
+def _parse_heart_beat(bridge, data):
+    """Parse the heart beat fields common to all HRM data pages."""
+    bridge._on_heart_beat(data[7], data[6], data[4] | (data[5] << 8))
+
+
+def _parse_page4_previous_event(bridge, data):
+    """Parse page 4, which also carries the previous heart beat event time in bytes 2-3."""
+    beat_time = data[4] | (data[5] << 8)
+    previous_beat_time = data[2] | (data[3] << 8)
+    bridge._on_heart_beat(data[7], data[6], beat_time, (beat_time - previous_beat_time) & 0xFFFF)
+
+
+# Indexed by data page number (byte 0 without the page change toggle bit).
+# Legacy HRMs don't put a page number in byte 0, so every entry falls back to
+# the common heart beat fields and only page 4 gets its own parser
+_PAGE_PARSERS = [_parse_heart_beat] * 128
+_PAGE_PARSERS[0x04] = _parse_page4_previous_event
+
 
 class HeartRateMonitorBridge:
-    def __init__(self, ant_device_id: int, ant_network_key: bytes = b'\xB9\xA5\x21\xFB\xBD\x72\xC3\x45'):
+    # Instance attributes live in slots rather than a per-instance __dict__,
+    # which makes the frequent reads in the ANT+ callback and BLE loop cheaper
+    __slots__ = (
+        'ant_device_id', 'ant_network_key', 'ant_node', 'ant_driver', 'ant_thread',
+        'hrm_channel', 'backend', 'current_heart_rate', 'last_heart_rate_time',
+        '_hr_slot', '_hr_event', '_loop', '_loop_time', '_rr_buffer',
+        '_last_beat_count', '_last_beat_time', '_last_sent_hr', '_last_keepalive',
+        '_hr_payloads', '_hr_buf', '_hr_buf_view', '_rr_structs',
+    )
+    
+    # Bluetooth LE Heart Rate Service and Characteristic UUIDs
+    HEART_RATE_SERVICE_UUID = HEART_RATE_SERVICE_UUID
+    HEART_RATE_MEASUREMENT_CHAR_UUID = HEART_RATE_MEASUREMENT_CHAR_UUID
+    
+    def __init__(self, ant_device_id: int, ant_network_key: bytes = b'\xB9\xA5\x21\xFB\xBD\x72\xC3\x45',
+                 backend: Optional[BLEBackend] = None):
         """
         Initialize the bridge with the ANT+ device ID of the heart rate monitor.
         
         Args:
             ant_device_id: The ANT+ device ID of your heart rate monitor
             ant_network_key: The ANT+ network key (default is for ANT+ public network)
+            backend: The BLE backend to broadcast with (default is chosen by $HRM_BLE_BACKEND)
         """
         self.ant_device_id = 22184
         self.ant_network_key = ant_network_key
         self.ant_node = None
         self.ant_driver = None
-        self.bluetooth_server = None
+        self.ant_thread: Optional[threading.Thread] = None
+        self.backend = backend if backend is not None else create_backend()
         self.current_heart_rate = 0
         self.last_heart_rate_time = 0
         
-        # Bluetooth LE Heart Rate Service and Characteristic UUIDs
-        self.HEART_RATE_SERVICE_UUID = "0000180D-0000-1000-8000-00805F9B34FB"
-        self.HEART_RATE_MEASUREMENT_CHAR_UUID = "00002A37-0000-1000-8000-00805F9B34FB"
+        # Latest heart rate handed over from the ANT+ thread; deque appends are
+        # atomic, so no lock is needed and older samples are simply replaced
+        self._hr_slot = collections.deque(maxlen=1)
+        self._hr_event = asyncio.Event()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        
+        # RR intervals (1/1024 s) waiting to go out with the next notification,
+        # keeping only the newest ones that fit
+        self._rr_buffer = collections.deque(maxlen=HR_MAX_RR_INTERVALS)
+        
+        # Last heart beat event seen on the ANT+ thread, used to derive RR intervals
+        self._last_beat_count: Optional[int] = None
+        self._last_beat_time = 0
+        
+        # Last notified heart rate and when it went out, for the on-change gate
+        self._last_sent_hr = -1
+        self._last_keepalive = 0.0
+        
+        # Heart rate measurement payloads for every 8-bit value, built once
+        # Format: [flags, heart_rate_value], flags 0x00 = UINT8, no extra fields
+        self._hr_payloads = [bytes((0x00, hr)) for hr in range(256)]
+        
+        # Reusable buffer and precompiled layouts for payloads carrying RR intervals
+        # Format: [flags, heart_rate_value, rr_interval...]
+        self._hr_buf = bytearray(2 + 2 * HR_MAX_RR_INTERVALS)
+        self._hr_buf_view = memoryview(self._hr_buf)
+        self._rr_structs = [struct.Struct(f'<BB{count}H') for count in range(HR_MAX_RR_INTERVALS + 1)]
         
     def setup_ant_node(self):
-        """Setup the ANT+ node to connect to the heart rate monitor."""
+        """Setup the ANT+ node to connect to the heart rate monitor.
+        
+        This performs blocking USB I/O, so it is run in a worker thread.
+        """
         # Create ANT+ node
         self.ant_node = easy.Node()
         
@@ -75,104 +162,191 @@ class HeartRateMonitorBridge:
         # Open channel
         self.hrm_channel.open()
         
+        # Run openant's event pump, which decodes messages and calls
+        # on_ant_broadcast, on its own thread away from the event loop
+        self.ant_thread = threading.Thread(target=self.ant_node.start, name="ant-node", daemon=True)
+        self.ant_thread.start()
+        
         logger.info(f"Listening for ANT+ HRM with device ID: {self.ant_device_id}")
     
     def on_ant_broadcast(self, data):
         """Callback for when ANT+ data is received."""
-        if len(data) >= 5:
-            # Parse ANT+ HRM data
-            # Byte 0: Heart beat count (cumulative)
-            # Byte 1: Computed heart rate
-            heart_rate = data[1]
-            
-            if heart_rate != 0:  # Only update if valid heart rate
-                self.current_heart_rate = heart_rate
-                self.last_heart_rate_time = time.time()
-                logger.info(f"Heart rate received: {heart_rate} BPM")
+        # Byte 0: Data page number, bit 7 toggles every 4 messages
+        _PAGE_PARSERS[data[0] & 0x7F](self, data)
     
-    async def start_bluetooth_server(self):
-        """Start the Bluetooth LE server to broadcast heart rate data."""
-        # Create a new Bless server
-        server = BlessServer(name="HRM-Bridge")
-        
-        # Define UUIDs for Heart Rate Service and Characteristic
-        heart_rate_service_uuid = "0000180D-0000-1000-8000-00805F9B34FB"  # Heart Rate Service
-        heart_rate_measurement_uuid = "00002A37-0000-1000-8000-00805F9B34FB"  # Heart Rate Measurement
+    def _on_heart_beat(self, heart_rate: int, beat_count: int, beat_time: int, rr_interval: Optional[int] = None):
+        """Handle the heart beat fields of an ANT+ data page on the openant thread."""
+        # Each beat is repeated across several messages; an RR interval is only
+        # valid for the first message of a new beat. Page 4 supplies its own
+        # interval, which also holds for the very first message received
+        if self._last_beat_count is None:
+            pass
+        elif beat_count == self._last_beat_count:
+            rr_interval = None
+        elif rr_interval is None and (beat_count - self._last_beat_count) & 0xFF == 1:
+            # Derive the beat-to-beat interval when exactly one new beat was seen
+            rr_interval = (beat_time - self._last_beat_time) & 0xFFFF
+        self._last_beat_count = beat_count
+        self._last_beat_time = beat_time
         
-        # Create the heart rate service
-        heart_rate_service = BlessGATTService(heart_rate_service_uuid)
+        if rr_interval is not None:
+            self._rr_buffer.append(rr_interval)
         
-        # Create the heart rate measurement characteristic
-        heart_rate_char = BlessGATTCharacteristic(
-            uuid=heart_rate_measurement_uuid,
-            properties=GATTCharacteristicProperties.notify,
-            permissions=GATTAttributePermissions.readable
-        )
-        
-        # Add the characteristic to the service
-        heart_rate_service.add_characteristic(heart_rate_char)
+        if heart_rate != 0:  # Only update if valid heart rate
+            # This callback runs on the openant thread, so leave the sample in
+            # the slot and only wake the broadcast loop through its event loop
+            self._hr_slot.append(heart_rate)
+            self._loop.call_soon_threadsafe(self._on_heart_rate)
+    
+    def _on_heart_rate(self):
+        """Record a new heart rate sample on the event loop and wake the broadcast loop."""
+        # Announce the first sample, then keep the 4 Hz per-sample log at DEBUG
+        if self.last_heart_rate_time == 0:
+            logger.info(f"Receiving heart rate data from ANT+ HRM {self.ant_device_id}")
+        elif logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Heart rate received: %d BPM", self._hr_slot[-1])
         
-        # Add the service to the server
-        server.add_service(heart_rate_service)
+        self.last_heart_rate_time = self._loop_time()
+        self._hr_event.set()
+    
+    async def start_bluetooth_server(self):
+        """Start the Bluetooth LE server to broadcast heart rate data."""
+        # Start the backend's Heart Rate Service peripheral
+        await self.backend.start("HRM-Bridge")
+        logger.info("Bluetooth LE peripheral started and advertising as Heart Rate Monitor")
         
-        # Subscribe to notifications (though we'll push data from our side)
-        def on_update_requested(characteristic: BlessGATTCharacteristic, value: bytearray):
-            logger.debug(f"Update requested for characteristic {characteristic}")
+        # Prefer the LE 2M PHY for new connections to halve airtime per notification;
+        # a non-connectable backend never has connections this would apply to
+        if self.backend.connectable:
+            await self.request_le_2m_phy()
         
-        server.subscribe(heart_rate_measurement_uuid, on_update_requested)
+        # Main loop to broadcast heart rate data
+        await self.broadcast_loop()
+    
+    async def request_le_2m_phy(self):
+        """Ask the local controller to prefer LE 2M PHY for new connections.
         
-        # Start the server
-        await server.start()
-        logger.info("Bluetooth LE peripheral started and advertising as Heart Rate Monitor")
+        The BLE backends have no API for PHY selection or MTU exchange. The
+        ATT MTU is negotiated by the central (BlueZ and CoreBluetooth accept
+        large MTUs automatically), but the default PHY can be set on Linux with
+        the HCI LE Set Default PHY command. This is best effort: it needs hcitool and
+        sufficient privileges, and failures are only logged.
+        """
+        if not sys.platform.startswith("linux"):
+            return
         
-        # Store the server and characteristic for later use
-        self.bluetooth_server = server
-        self.heart_rate_characteristic = heart_rate_char
+        # OGF 0x08 (LE), OCF 0x0031 (LE Set Default PHY)
+        # ALL_PHYS=0x00, TX_PHYS=0x02 (LE 2M), RX_PHYS=0x02 (LE 2M)
+        try:
+            process = await asyncio.create_subprocess_exec(
+                "hcitool", "cmd", "0x08", "0x0031", "0x00", "0x02", "0x02",
+                stdout=asyncio.subprocess.DEVNULL,
+                stderr=asyncio.subprocess.PIPE
+            )
+            _, stderr = await process.communicate()
+        except OSError as e:
+            logger.warning(f"Could not run hcitool ({e}); keeping the default LE 1M PHY")
+            return
         
-        # Main loop to broadcast heart rate data
-        await self.broadcast_loop(server, heart_rate_char)
+        if process.returncode == 0:
+            logger.info("Requested LE 2M PHY as the default for new connections")
+        else:
+            logger.warning(f"Could not set LE 2M PHY: {stderr.decode().strip()}")
     
-    async def broadcast_loop(self, server, heart_rate_char):
+    async def broadcast_loop(self):
         """Main loop to broadcast heart rate data via Bluetooth LE."""
+        backoff = 0.0
+        
         while True:
-            if self.current_heart_rate > 0:
-                # Create heart rate measurement data following Bluetooth SIG specification
-                # Format: Flags (1 byte) + Heart Rate (1-2 bytes)
-                # Flags: bit 0 = 0 (Heart Rate Value Format is UINT8)
-                # Other bits = 0 (no extra fields)
-                flags = 0x00  # 8-bit heart rate value
+            # Sleep until the ANT+ callback signals a new heart rate
+            await self._hr_event.wait()
+            
+            # Give closely spaced samples a moment to arrive, then send them
+            # together in one notification using the most recent heart rate
+            await asyncio.sleep(HR_BATCH_WINDOW)
+            self._hr_event.clear()
+            heart_rate = self._hr_slot[-1]
+            self.current_heart_rate = heart_rate
+            
+            # Skip unchanged values unless the keepalive is due; pending RR
+            # intervals count as a change, so they are never held back until
+            # the bounded buffer overflows
+            now = self._loop_time()
+            if (heart_rate == self._last_sent_hr and not self._rr_buffer
+                    and now - self._last_keepalive < HR_KEEPALIVE_INTERVAL):
+                continue
+            
+            # Pop rather than clear, so intervals appended meanwhile are kept
+            rr_intervals = [self._rr_buffer.popleft() for _ in range(len(self._rr_buffer))]
+            
+            # Heart rate measurement data following Bluetooth SIG specification
+            # ANT+ reports the computed heart rate as a single byte, so the
+            # UINT8 form always applies
+            if rr_intervals:
+                # Flags: bit 4 = 1 (RR-Interval present), UINT16 values follow
+                # The backend keeps the value it is given, so send an immutable copy
+                rr_struct = self._rr_structs[len(rr_intervals)]
+                rr_struct.pack_into(self._hr_buf, 0, 0x10, heart_rate, *rr_intervals)
+                hr_data = self._hr_buf_view[:rr_struct.size].tobytes()
+            else:
+                hr_data = self._hr_payloads[heart_rate]
+            
+            try:
+                # Update the characteristic value through the BLE backend. This
+                # only hands the value to the stack, which sends it later, so it
+                # does not say when the notification went out; an error is the
+                # only overload signal a backend can give
+                await self.backend.update_hr(hr_data)
+                self._last_sent_hr = heart_rate
+                self._last_keepalive = now
+                backoff = 0.0
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug("Updated heart rate characteristic: %d BPM", heart_rate)
+            except Exception as e:
+                logger.error(f"Error updating heart rate characteristic: {e}")
                 
-                # Pack the heart rate data
-                # Format: [flags, heart_rate_value]
-                hr_data = struct.pack('<BB', flags, self.current_heart_rate)
+                # Put the newest unsent RR intervals back in front of any that
+                # arrived meanwhile, only as many as fit: an overflowing
+                # extendleft would drop the newest intervals from the right
+                free = HR_MAX_RR_INTERVALS - len(self._rr_buffer)
+                if free > 0:
+                    self._rr_buffer.extendleft(reversed(rr_intervals[-free:]))
                 
-                try:
-                    # Update the characteristic value using Bless API
-                    await server.update_value(heart_rate_char.uuid, hr_data)
-                    logger.debug(f"Updated heart rate characteristic: {self.current_heart_rate} BPM")
-                except Exception as e:
-                    logger.error(f"Error updating heart rate characteristic: {e}")
-            
-            # Wait for 1 second before sending next update
-            await asyncio.sleep(1)
+                # The backend rejected the notification (only bless reports
+                # this); wait before trying again, with new samples coalescing
+                # in the slot meanwhile
+                backoff = min(max(backoff * 2, HR_SEND_BACKOFF_MIN), HR_SEND_BACKOFF_MAX)
+                await asyncio.sleep(backoff)
     
     async def run(self):
         """Run the bridge application."""
+        # Capture the running loop before openant starts delivering callbacks
+        self._loop = asyncio.get_running_loop()
+        self._loop_time = self._loop.time
+        
+        # Setup ANT+ connection in a worker thread while the Bluetooth LE
+        # server starts, so the blocking USB round-trips don't stall the loop
+        ant_setup = self._loop.run_in_executor(None, self.setup_ant_node)
+        bluetooth_task = asyncio.create_task(self.start_bluetooth_server())
+        
         try:
-            # Setup ANT+ connection
-            self.setup_ant_node()
-            
-            # Start Bluetooth LE server
-            await self.start_bluetooth_server()
+            await asyncio.gather(ant_setup, bluetooth_task)
             
         except KeyboardInterrupt:
             logger.info("Shutting down...")
         except Exception as e:
             logger.error(f"Error in bridge application: {e}")
         finally:
+            # gather doesn't cancel the other side when one fails: stop the
+            # Bluetooth LE task and let a running ANT+ setup finish (it can't be
+            # interrupted), so the node and backend exist before they're stopped
+            bluetooth_task.cancel()
+            await asyncio.gather(bluetooth_task, ant_setup, return_exceptions=True)
+            
             # Cleanup
             if self.ant_node:
                 self.ant_node.stop()
+            await self.backend.stop()
 
 
 async def main():
@@ -186,4 +360,11 @@ async def main():
 
 
 if __name__ == "__main__":
+    # Use uvloop's faster event loop when it is installed
+    try:
+        import uvloop
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    except ImportError:
+        pass
+    
     asyncio.run(main())